@@ -1,9 +1,14 @@
 import streamlit as st
-import yfinance as yf
-import plotly.graph_objects as go
-import plotly.express as px
+import numpy as np
 import pandas as pd
+import hashlib
+import hmac
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, fields
 from datetime import datetime, timedelta
+from pathlib import Path
 
 # Page configuration
 st.set_page_config(
@@ -12,13 +17,17 @@ st.set_page_config(
     layout="wide"
 )
 
+# Ticker symbols: letters/digits plus the . - ^ = used by share classes, indices,
+# futures and foreign listings (BRK-B, ^GSPC, ES=F, 0700.HK)
+_TICKER_RE = re.compile(r'[A-Z0-9^][A-Z0-9.\-=]*')
+
 # Password protection
+# Set your password here - only its hash is kept around for comparison
+_PW_HASH = hashlib.sha256(b"Invest2026").digest()  # Change this to whatever you want
+
 def check_password():
     """Returns True if the user has entered the correct password."""
     
-    # Set your password here
-    CORRECT_PASSWORD = "Invest2026"  # Change this to whatever you want
-    
     if "password_correct" not in st.session_state:
         st.session_state["password_correct"] = False
     
@@ -34,7 +43,8 @@ def check_password():
     col1, col2, col3 = st.columns([1, 1, 2])
     with col1:
         if st.button("Login"):
-            if password == CORRECT_PASSWORD:
+            # Constant-time compare so response timing doesn't leak the password
+            if hmac.compare_digest(_PW_HASH, hashlib.sha256(password.encode()).digest()):
                 st.session_state["password_correct"] = True
                 st.rerun()
             else:
@@ -42,6 +52,143 @@ def check_password():
     
     return False
 
+# The handful of info fields the dashboard reads, instead of the full ~150-key dict
+@dataclass(slots=True)
+class Snapshot:
+    shortName: str | None = None
+    sector: str | None = None
+    currentPrice: float | None = None
+    previousClose: float | None = None
+    marketCap: float | None = None
+    fiftyTwoWeekHigh: float | None = None
+    fiftyTwoWeekLow: float | None = None
+    averageVolume: float | None = None
+    beta: float | None = None
+    trailingPE: float | None = None
+    forwardPE: float | None = None
+    priceToBook: float | None = None
+    dividendYield: float | None = None
+    totalRevenue: float | None = None
+    netIncomeToCommon: float | None = None
+    freeCashflow: float | None = None
+    operatingMargins: float | None = None
+    profitMargins: float | None = None
+    returnOnEquity: float | None = None
+    debtToEquity: float | None = None
+    currentRatio: float | None = None
+    
+    @staticmethod
+    def project(info):
+        """Pick just the Snapshot fields out of a yfinance info dict, as a plain dict."""
+        return {f.name: info.get(f.name) for f in fields(Snapshot)}
+
+# On-disk history cache - daily bars are reused across sessions for a day
+HISTORY_CACHE_DIR = Path.home() / ".cache" / "invdash"
+HISTORY_CACHE_MAX_AGE = 86400  # seconds
+
+def history_cache_path(ticker, period):
+    return HISTORY_CACHE_DIR / f"{ticker}_{period}.parquet"
+
+def read_cached_history(ticker, period):
+    """Return the cached history for ticker/period, or None if missing or stale."""
+    path = history_cache_path(ticker, period)
+    try:
+        fetched_at = float(path.with_suffix('.meta').read_text())
+        if time.time() - fetched_at < HISTORY_CACHE_MAX_AGE:
+            # No dtype_backend here: it would also turn the index into a plain Arrow
+            # timestamp Index instead of a DatetimeIndex; only the values need Arrow
+            return pd.read_parquet(path, columns=['Close']).astype('double[pyarrow]')
+    except (OSError, ValueError):
+        pass
+    return None
+
+def write_cached_history(ticker, period, history):
+    """Save history to the disk cache; failures only cost a refetch later."""
+    path = history_cache_path(ticker, period)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        history.to_parquet(path, compression='zstd')
+        path.with_suffix('.meta').write_text(str(time.time()))
+    except OSError:
+        pass
+
+# One session for the whole process: yfinance keeps its HTTP session (and cookie/crumb)
+# in a process-wide singleton, so per-user sessions would keep replacing each other
+@st.cache_resource
+def get_http_session():
+    """Return the process-wide curl_cffi session shared by every Yahoo request."""
+    from curl_cffi import requests as crequests
+    return crequests.Session(impersonate="chrome120")
+
+class IncompleteHistoryError(LookupError):
+    """Raised when some tickers came back empty; carries the histories that did load."""
+    def __init__(self, histories, failed):
+        super().__init__(f"No price history returned for {', '.join(failed)}")
+        self.histories = histories
+
+# Cached data loaders - repeat analyses within 15 minutes skip the network
+# (the leading underscore keeps Streamlit from hashing the session argument).
+# Empty responses raise instead of returning, since cache_data doesn't store
+# exceptions - a rate-limited or failed fetch is then retried on the next run.
+@st.cache_data(ttl=900, show_spinner=False)
+def load_histories(tickers, period, _session=None):
+    """Load price history for all tickers, downloading any not cached on disk in one batch."""
+    histories = {}
+    missing = []
+    for ticker in tickers:
+        history = read_cached_history(ticker, period)
+        if history is None:
+            missing.append(ticker)
+        else:
+            histories[ticker] = history
+    
+    if not missing:
+        return histories
+    
+    import yfinance as yf  # deferred: only needed on a cache miss
+    all_history = yf.download(
+        " ".join(missing),
+        period=period,
+        group_by='ticker',
+        threads=True,
+        progress=False,
+        session=_session
+    )
+    
+    for ticker in missing:
+        # Slice this ticker out of the batched download
+        if isinstance(all_history.columns, pd.MultiIndex):
+            if ticker not in all_history.columns.get_level_values(0):
+                continue
+            history = all_history[ticker]
+        else:
+            history = all_history
+        # Only Close is ever used downstream - dropping the other columns is the memory win;
+        # it stays float64 since float32 can't hold cents on high-priced tickers. The
+        # Arrow backing keeps it in a columnar buffer that Arrow compute kernels work on
+        history = history.dropna(how='all')[['Close']].astype('double[pyarrow]')
+        
+        if len(history) > 0:
+            write_cached_history(ticker, period, history)
+            histories[ticker] = history
+    
+    failed = [t for t in tickers if t not in histories]
+    if failed:
+        raise IncompleteHistoryError(histories, failed)
+    
+    return histories
+
+# Returns a plain dict rather than a Snapshot: cache_data pickles its result, and classes
+# defined in the script can't be pickled once another run has installed a fresh __main__
+@st.cache_data(ttl=900, show_spinner=False)
+def load_snapshot_fields(ticker, _session=None):
+    """Fetch the info for a single ticker, projected to the Snapshot fields."""
+    import yfinance as yf
+    info = yf.Ticker(ticker, session=_session).info
+    if not info:
+        raise LookupError(f"No info returned for {ticker}")
+    return Snapshot.project(info)
+
 # Check password before showing app
 if not check_password():
     st.stop()
@@ -60,7 +207,7 @@ ticker_input = st.sidebar.text_input(
 )
 
 # Parse tickers
-tickers = [t.strip().upper() for t in ticker_input.split(",") if t.strip()]
+tickers = _TICKER_RE.findall(ticker_input.upper())
 
 # Time period selection
 time_period = st.sidebar.selectbox(
@@ -85,333 +232,400 @@ if st.sidebar.button("Analyze Stocks", type="primary"):
         st.error("Please enter at least one stock ticker")
     else:
         st.session_state['analyze'] = True
+        st.session_state.pop('cache_key', None)  # an explicit click always reloads
         st.session_state['tickers'] = tickers
         st.session_state['period'] = selected_period
 
-# Main content
-if 'analyze' in st.session_state and st.session_state['analyze']:
-    tickers = st.session_state['tickers']
-    selected_period = st.session_state['period']
+# Chart builders - figures are cached per process, keyed on a hash of their data
+# (the underscore-prefixed frame itself is skipped by Streamlit's argument hashing)
+def frame_hash(df):
+    # Row hashes cover values and index; the column labels (tickers) are added separately
+    return hash((tuple(df.columns), int(pd.util.hash_pandas_object(df).sum())))
+
+@st.cache_resource(max_entries=16)
+def build_price_fig(_closes, title, data_hash):
+    """Build the price comparison line chart from the wide closes frame."""
+    # Convert the shared date index once and reuse it for every trace
+    dates = pd.DatetimeIndex(_closes.index)
+    if dates.tz is not None:
+        dates = dates.tz_localize(None)
+    x = dates.values.astype('datetime64[ms]')
+    
+    # WebGL traces stay responsive for multi-year daily histories where SVG bogs down
+    fig = go.Figure(data=[
+        go.Scattergl(
+            x=x,
+            y=_closes[ticker].to_numpy(dtype='float64', na_value=np.nan),
+            mode='lines',
+            name=ticker,
+            connectgaps=True,
+            hovertemplate=f'{ticker}<br>Date: %{{x}}<br>Price: $%{{y:.2f}}<extra></extra>'
+        )
+        for ticker in _closes.columns
+    ])
     
-    # Create tabs for different views
-    tab1, tab2, tab3, tab4 = st.tabs(["📊 Overview", "📈 Price Charts", "💰 Financials", "⚖️ Comparison"])
+    fig.update_layout(
+        title=title,
+        xaxis_title="Date",
+        yaxis_title="Price ($)",
+        hovermode='x unified',
+        height=500,
+        template='plotly_white'
+    )
+    return fig
+
+@st.cache_resource(max_entries=16)
+def build_rev_bar(_rev_df, data_hash):
+    """Build the total revenue bar chart."""
+    return px.bar(
+        _rev_df,
+        x='Ticker',
+        y='Revenue',
+        title='Total Revenue Comparison',
+        labels={'Revenue': 'Revenue ($)'},
+        color='Ticker'
+    )
+
+@st.cache_resource(max_entries=16)
+def build_pe_bar(_pe_df, data_hash):
+    """Build the P/E ratio bar chart."""
+    return px.bar(
+        _pe_df,
+        x='Ticker',
+        y='P/E Ratio',
+        title='P/E Ratio Comparison',
+        color='Ticker'
+    )
+
+# Views - each builds only the frames and charts it displays
+def render_overview(stock_data):
+    """Render stock cards with price, change and key metrics."""
+    st.header("Stock Overview")
     
-    # Fetch data for all tickers
-    stock_data = {}
-    progress_bar = st.progress(0)
-    status_text = st.empty()
+    if len(stock_data) == 0:
+        st.info("No stock data available to display")
+    else:
+        # Display cards for each stock
+        cols = st.columns(min(len(stock_data), 3))
     
-    for idx, ticker in enumerate(tickers):
-        try:
-            status_text.text(f"Fetching data for {ticker}... ({idx + 1}/{len(tickers)})")
-            stock = yf.Ticker(ticker)
+    for idx, (ticker, data) in enumerate(stock_data.items()):
+        with cols[idx % 3]:
+            snap = data['snapshot']
+            history = data['history']
             
-            # Fetch data with error handling
-            info = stock.info
-            history = stock.history(period=selected_period)
+            # Get current price and change
+            current_price = snap.currentPrice or 0
+            if current_price == 0 and len(history) > 0:
+                current_price = history['Close'].iloc[-1]
             
-            # Only add if we got valid data
-            if len(history) > 0 and info:
-                stock_data[ticker] = {
-                    'ticker_obj': stock,
-                    'info': info,
-                    'history': history,
-                    'financials': stock.financials,
-                    'balance_sheet': stock.balance_sheet
-                }
-            else:
-                st.warning(f"No data available for {ticker}")
-                
-        except Exception as e:
-            st.warning(f"Could not fetch data for {ticker}: {str(e)}")
-        
-        # Update progress bar
-        progress_bar.progress((idx + 1) / len(tickers))
-        
-        # Add delay to avoid rate limiting
-        import time
-        time.sleep(1)
+            previous_close = snap.previousClose or 0
+            change = current_price - previous_close
+            change_pct = (change / previous_close * 100) if previous_close > 0 else 0
+            
+            # Display card
+            st.subheader(f"{ticker}")
+            st.metric(
+                label=snap.shortName or ticker,
+                value=f"${current_price:.2f}",
+                delta=f"{change_pct:.2f}%"
+            )
+            
+            # Key metrics
+            st.markdown(f"""
+            **Market Cap:** ${snap.marketCap or 0:,.0f}  
+            **P/E Ratio:** {snap.trailingPE or 'N/A'}  
+            **Dividend Yield:** {(snap.dividendYield or 0)*100:.2f}%  
+            **52W High:** ${snap.fiftyTwoWeekHigh or 'N/A'}  
+            **52W Low:** ${snap.fiftyTwoWeekLow or 'N/A'}  
+            **Sector:** {snap.sector or 'N/A'}
+            """)
+
+def render_charts(stock_data, time_period):
+    """Render historical price chart and performance summary."""
+    st.header("Historical Price Performance")
     
-    progress_bar.empty()
-    status_text.empty()
+    # Wide frame of closing prices, one column per ticker
+    closes = pd.concat({t: d['history']['Close'] for t, d in stock_data.items()}, axis=1)
     
-    # Check if we got any data
-    if len(stock_data) == 0:
-        st.error("⚠️ Could not fetch data for any stocks. This might be due to:")
-        st.markdown("""
-        - **Rate limiting** - Yahoo Finance limits requests. Wait 5-10 minutes and try again.
-        - **Invalid ticker symbols** - Make sure you're using correct symbols (e.g., AAPL, MSFT)
-        - **Network issues** - Check your internet connection
-        
-        Try again in a few minutes with fewer stocks (1-3 tickers).
-        """)
-        st.stop()
+    fig = build_price_fig(closes, f"Stock Price Comparison - {time_period}", frame_hash(closes))
+    st.plotly_chart(fig, use_container_width=True)
     
-    # TAB 1: Overview
-    with tab1:
-        st.header("Stock Overview")
-        
-        if len(stock_data) == 0:
-            st.info("No stock data available to display")
-        else:
-            # Display cards for each stock
-            cols = st.columns(min(len(stock_data), 3))
+    # Performance table
+    st.subheader("Performance Summary")
+    
+    closes = closes.loc[:, closes.count() > 1]
+    
+    if not closes.empty:
+        # Stacked price matrix, one column per ticker, reduced in single NumPy passes
+        arr = closes.to_numpy(dtype='float64', na_value=np.nan)
         
-        for idx, (ticker, data) in enumerate(stock_data.items()):
-            with cols[idx % 3]:
-                info = data['info']
-                history = data['history']
-                
-                # Get current price and change
-                current_price = info.get('currentPrice', 0)
-                if current_price == 0 and len(history) > 0:
-                    current_price = history['Close'].iloc[-1]
-                
-                previous_close = info.get('previousClose', 0)
-                change = current_price - previous_close
-                change_pct = (change / previous_close * 100) if previous_close > 0 else 0
-                
-                # Display card
-                st.subheader(f"{ticker}")
-                st.metric(
-                    label=info.get('shortName', ticker),
-                    value=f"${current_price:.2f}",
-                    delta=f"{change_pct:.2f}%"
-                )
-                
-                # Key metrics
-                st.markdown(f"""
-                **Market Cap:** ${info.get('marketCap', 0):,.0f}  
-                **P/E Ratio:** {info.get('trailingPE', 'N/A')}  
-                **Dividend Yield:** {info.get('dividendYield', 0)*100:.2f}%  
-                **52W High:** ${info.get('fiftyTwoWeekHigh', 'N/A')}  
-                **52W Low:** ${info.get('fiftyTwoWeekLow', 'N/A')}  
-                **Sector:** {info.get('sector', 'N/A')}
-                """)
-    
-    # TAB 2: Price Charts
-    with tab2:
-        st.header("Historical Price Performance")
+        # Histories may not share a calendar, so use each column's first/last valid price
+        filled = closes.ffill().bfill().to_numpy(dtype='float64', na_value=np.nan)
+        start_price = filled[0]
+        end_price = filled[-1]
         
-        # Create price chart
-        fig = go.Figure()
+        perf_df = pd.DataFrame({
+            'Ticker': closes.columns,
+            'Start Price': start_price,
+            'Current Price': end_price,
+            'Total Return': (end_price / start_price - 1) * 100,
+            'Volatility (Std Dev)': np.nanstd(arr, axis=0, ddof=1)
+        })
         
-        for ticker, data in stock_data.items():
-            history = data['history']
-            if len(history) > 0:
-                fig.add_trace(go.Scatter(
-                    x=history.index,
-                    y=history['Close'],
-                    mode='lines',
-                    name=ticker,
-                    hovertemplate=f'{ticker}<br>Date: %{{x}}<br>Price: $%{{y:.2f}}<extra></extra>'
-                ))
-        
-        fig.update_layout(
-            title=f"Stock Price Comparison - {time_period}",
-            xaxis_title="Date",
-            yaxis_title="Price ($)",
-            hovermode='x unified',
-            height=500,
-            template='plotly_white'
+        st.dataframe(
+            perf_df.style.format({
+                'Start Price': '${:.2f}',
+                'Current Price': '${:.2f}',
+                'Total Return': '{:.2f}%',
+                'Volatility (Std Dev)': '{:.2f}'
+            }),
+            use_container_width=True
         )
-        
-        st.plotly_chart(fig, use_container_width=True)
-        
-        # Performance table
-        st.subheader("Performance Summary")
-        perf_data = []
-        
-        for ticker, data in stock_data.items():
-            history = data['history']
-            if len(history) > 1:
-                start_price = history['Close'].iloc[0]
-                end_price = history['Close'].iloc[-1]
-                total_return = ((end_price - start_price) / start_price) * 100
-                
-                perf_data.append({
-                    'Ticker': ticker,
-                    'Start Price': f"${start_price:.2f}",
-                    'Current Price': f"${end_price:.2f}",
-                    'Total Return': f"{total_return:.2f}%",
-                    'Volatility (Std Dev)': f"{history['Close'].std():.2f}"
-                })
-        
-        if perf_data:
-            perf_df = pd.DataFrame(perf_data)
-            st.dataframe(perf_df, use_container_width=True)
+
+def render_financials(stock_data):
+    """Render financial metrics table and revenue chart."""
+    st.header("Financial Metrics")
     
-    # TAB 3: Financials
-    with tab3:
-        st.header("Financial Metrics")
-        
-        # Create comparison table
-        financial_data = []
-        
-        for ticker, data in stock_data.items():
-            info = data['info']
-            
-            financial_data.append({
-                'Ticker': ticker,
-                'Revenue': f"${info.get('totalRevenue', 0):,.0f}",
-                'Net Income': f"${info.get('netIncomeToCommon', 0):,.0f}",
-                'Operating Margin': f"{info.get('operatingMargins', 0)*100:.2f}%",
-                'Profit Margin': f"{info.get('profitMargins', 0)*100:.2f}%",
-                'ROE': f"{info.get('returnOnEquity', 0)*100:.2f}%",
-                'Debt/Equity': f"{info.get('debtToEquity', 0):.2f}",
-                'Current Ratio': f"{info.get('currentRatio', 0):.2f}",
-                'Free Cash Flow': f"${info.get('freeCashflow', 0):,.0f}"
-            })
-        
-        if financial_data:
-            fin_df = pd.DataFrame(financial_data)
-            st.dataframe(fin_df, use_container_width=True)
-        
-        # Revenue and earnings charts
-        st.subheader("Revenue Comparison")
-        
-        revenue_data = []
-        for ticker, data in stock_data.items():
-            info = data['info']
-            revenue_data.append({
-                'Ticker': ticker,
-                'Revenue': info.get('totalRevenue', 0)
-            })
-        
-        if revenue_data:
-            rev_df = pd.DataFrame(revenue_data)
-            fig_rev = px.bar(
-                rev_df,
+    # Create comparison table of raw numbers so columns sort numerically
+    snapshots = {t: d['snapshot'] for t, d in stock_data.items()}
+    fin_df = pd.DataFrame.from_records([
+        {
+            'Ticker': ticker,
+            'Revenue': snap.totalRevenue or 0,
+            'Net Income': snap.netIncomeToCommon or 0,
+            'Operating Margin': snap.operatingMargins or 0,
+            'Profit Margin': snap.profitMargins or 0,
+            'ROE': snap.returnOnEquity or 0,
+            'Debt/Equity': snap.debtToEquity or 0,
+            'Current Ratio': snap.currentRatio or 0,
+            'Free Cash Flow': snap.freeCashflow or 0
+        }
+        for ticker, snap in snapshots.items()
+    ])
+    
+    if not fin_df.empty:
+        st.dataframe(
+            fin_df.style.format({
+                'Revenue': '${:,.0f}',
+                'Net Income': '${:,.0f}',
+                'Operating Margin': '{:.2%}',
+                'Profit Margin': '{:.2%}',
+                'ROE': '{:.2%}',
+                'Debt/Equity': '{:.2f}',
+                'Current Ratio': '{:.2f}',
+                'Free Cash Flow': '${:,.0f}'
+            }),
+            use_container_width=True
+        )
+    
+    # Revenue and earnings charts
+    st.subheader("Revenue Comparison")
+    
+    rev_df = pd.DataFrame({
+        'Ticker': list(stock_data),
+        'Revenue': [d['snapshot'].totalRevenue or 0 for d in stock_data.values()]
+    })
+    
+    if not rev_df.empty:
+        fig_rev = build_rev_bar(rev_df, frame_hash(rev_df))
+        st.plotly_chart(fig_rev, use_container_width=True)
+
+def render_comparison(stock_data):
+    """Render side-by-side metrics, valuation and ratio charts."""
+    st.header("Side-by-Side Comparison")
+    
+    comparison_metrics = {
+        'currentPrice': 'Current Price',
+        'marketCap': 'Market Cap',
+        'trailingPE': 'P/E Ratio (TTM)',
+        'forwardPE': 'Forward P/E',
+        'priceToBook': 'Price/Book',
+        'dividendYield': 'Dividend Yield',
+        'beta': 'Beta',
+        'fiftyTwoWeekHigh': '52W High',
+        'fiftyTwoWeekLow': '52W Low',
+        'averageVolume': 'Avg Volume'
+    }
+    
+    # Create comparison dataframe of raw values, one row per ticker
+    comp_df = pd.DataFrame.from_dict(
+        {t: {m: getattr(data['snapshot'], m) for m in comparison_metrics} for t, data in stock_data.items()},
+        orient='index'
+    )
+    comp_df = (
+        comp_df.reindex(columns=list(comparison_metrics))
+        .apply(pd.to_numeric, errors='coerce')
+        .rename(columns=comparison_metrics)
+    )
+    
+    # Format every column in a single pass
+    comp_format = {col: '{:.2f}' for col in comp_df.columns}
+    comp_format['Market Cap'] = '${:,.0f}'
+    comp_format['Dividend Yield'] = '{:.2%}'
+    
+    st.dataframe(comp_df.style.format(comp_format, na_rep='N/A'), use_container_width=True)
+    
+    # Valuation comparison chart
+    st.subheader("Valuation Metrics")
+    
+    # Filter out extreme values
+    pe_df = pd.DataFrame(
+        [(t, pe) for t, d in stock_data.items()
+         if (pe := d['snapshot'].trailingPE) and 0 < pe < 100],
+        columns=['Ticker', 'P/E Ratio']
+    )
+    
+    if not pe_df.empty:
+        fig_pe = build_pe_bar(pe_df, frame_hash(pe_df))
+        st.plotly_chart(fig_pe, use_container_width=True)
+
+    # Financial Ratios Comparison Chart
+    st.subheader("Financial Ratios Comparison")
+
+    ratio_metrics = [
+        ('Operating Margin', lambda snap: snap.operatingMargins),
+        ('Profit Margin', lambda snap: snap.profitMargins),
+        ('ROE', lambda snap: snap.returnOnEquity),
+        ('Debt/Equity', lambda snap: snap.debtToEquity),
+        ('Current Ratio', lambda snap: snap.currentRatio),
+        ('P/E Ratio', lambda snap: snap.trailingPE),
+        ('Forward P/E', lambda snap: snap.forwardPE),
+        ('Price/Book', lambda snap: snap.priceToBook),
+        ('Dividend Yield', lambda snap: snap.dividendYield),
+    ]
+
+    ratio_data = []
+    for ticker, data in stock_data.items():
+        snap = data['snapshot']
+        row = {'Ticker': ticker}
+        for name, fn in ratio_metrics:
+            val = fn(snap)
+            if name in ['Operating Margin', 'Profit Margin', 'ROE', 'Dividend Yield'] and isinstance(val, (int, float)):
+                row[name] = val * 100
+            elif isinstance(val, (int, float)):
+                row[name] = val
+            else:
+                row[name] = None
+        ratio_data.append(row)
+
+    ratio_df = pd.DataFrame(ratio_data)
+    if not ratio_df.drop(columns=['Ticker']).isna().all().all():
+        ratio_melt = ratio_df.melt(id_vars='Ticker', var_name='Metric', value_name='Value').dropna(subset=['Value'])
+        if not ratio_melt.empty:
+            fig_ratios = px.bar(
+                ratio_melt,
                 x='Ticker',
-                y='Revenue',
-                title='Total Revenue Comparison',
-                labels={'Revenue': 'Revenue ($)'},
-                color='Ticker'
+                y='Value',
+                color='Metric',
+                barmode='group',
+                title='Financial Ratios Comparison',
+                labels={'Value': 'Value (percent for margins/ROE/dividend)'}
             )
-            st.plotly_chart(fig_rev, use_container_width=True)
+            st.plotly_chart(fig_ratios, use_container_width=True)
+    else:
+        st.info("No ratio data available to plot.")
+
+# Main content
+if 'analyze' in st.session_state and st.session_state['analyze']:
+    # Deferred so the login screen and welcome page don't pay for plotly
+    import plotly.graph_objects as go
+    import plotly.express as px
     
-    # TAB 4: Comparison
-    with tab4:
-        st.header("Side-by-Side Comparison")
-        
-        comparison_metrics = [
-            'currentPrice',
-            'marketCap',
-            'trailingPE',
-            'forwardPE',
-            'priceToBook',
-            'dividendYield',
-            'beta',
-            'fiftyTwoWeekHigh',
-            'fiftyTwoWeekLow',
-            'averageVolume'
-        ]
+    tickers = st.session_state['tickers']
+    selected_period = st.session_state['period']
+    
+    # View selector - unlike st.tabs, only the chosen view's body runs
+    view = st.radio(
+        "View",
+        ["📊 Overview", "📈 Price Charts", "💰 Financials", "⚖️ Comparison"],
+        horizontal=True,
+        label_visibility="collapsed"
+    )
+    
+    # Reuse the last fetch on reruns for the same analysis
+    cache_key = (tuple(tickers), selected_period)
+    if st.session_state.get('cache_key') == cache_key:
+        stock_data = st.session_state['stock_data']
+    else:
+        # Fetch data for all tickers
+        stock_data = {}
+        progress_bar = st.progress(0)
+        status_text = st.empty()
         
-        comparison_data = {}
+        # Fetch price history for every ticker in one batched request
+        status_text.text(f"Fetching price history for {len(tickers)} ticker(s)...")
+        try:
+            # Shared across tickers, reruns and users so connections are reused, not re-handshaked
+            session = get_http_session()
+            histories = load_histories(tuple(tickers), selected_period, session)
+        except IncompleteHistoryError as e:
+            # Tickers missing here get the usual per-ticker "No data available" warning
+            histories = e.histories
+        except Exception as e:
+            st.warning(f"Could not fetch price history: {str(e)}")
+            session, histories = None, {}
         
-        for ticker, data in stock_data.items():
-            info = data['info']
-            ticker_metrics = {}
+        def fetch_one(ticker):
+            """Fetch all data for a single ticker; returns None if nothing came back."""
+            # Only return if we got valid data - skip the info request without a history
+            history = histories.get(ticker)
+            if history is None or len(history) == 0:
+                return None
             
-            for metric in comparison_metrics:
-                value = info.get(metric, 'N/A')
-                if isinstance(value, (int, float)) and metric == 'marketCap':
-                    ticker_metrics[metric] = f"${value:,.0f}"
-                elif isinstance(value, (int, float)) and metric == 'dividendYield':
-                    ticker_metrics[metric] = f"{value*100:.2f}%"
-                elif isinstance(value, (int, float)):
-                    ticker_metrics[metric] = f"{value:.2f}"
-                else:
-                    ticker_metrics[metric] = value
+            try:
+                snapshot_fields = load_snapshot_fields(ticker, session)
+            except LookupError:
+                return None
             
-            comparison_data[ticker] = ticker_metrics
-        
-        # Create comparison dataframe
-        comp_df = pd.DataFrame(comparison_data).T
-        comp_df.columns = [
-            'Current Price',
-            'Market Cap',
-            'P/E Ratio (TTM)',
-            'Forward P/E',
-            'Price/Book',
-            'Dividend Yield',
-            'Beta',
-            '52W High',
-            '52W Low',
-            'Avg Volume'
-        ]
+            return {'snapshot': Snapshot(**snapshot_fields), 'history': history}
         
-        st.dataframe(comp_df, use_container_width=True)
+        # Fetch tickers concurrently - the work is network-bound, not CPU-bound
+        with ThreadPoolExecutor(max_workers=min(8, len(tickers))) as executor:
+            futures = {executor.submit(fetch_one, t): t for t in tickers}
+            
+            for idx, future in enumerate(as_completed(futures)):
+                ticker = futures[future]
+                status_text.text(f"Fetched data for {ticker} ({idx + 1}/{len(tickers)})")
+                try:
+                    result = future.result()
+                    if result is not None:
+                        stock_data[ticker] = result
+                    else:
+                        st.warning(f"No data available for {ticker}")
+                        
+                except Exception as e:
+                    st.warning(f"Could not fetch data for {ticker}: {str(e)}")
+                
+                # Update progress bar
+                progress_bar.progress((idx + 1) / len(tickers))
         
-        # Valuation comparison chart
-        st.subheader("Valuation Metrics")
+        progress_bar.empty()
+        status_text.empty()
         
-        pe_data = []
-        for ticker, data in stock_data.items():
-            info = data['info']
-            pe = info.get('trailingPE', None)
-            if pe and pe > 0 and pe < 100:  # Filter out extreme values
-                pe_data.append({
-                    'Ticker': ticker,
-                    'P/E Ratio': pe
-                })
+        # Check if we got any data
+        if len(stock_data) == 0:
+            st.error("⚠️ Could not fetch data for any stocks. This might be due to:")
+            st.markdown("""
+            - **Rate limiting** - Yahoo Finance limits requests. Wait 5-10 minutes and try again.
+            - **Invalid ticker symbols** - Make sure you're using correct symbols (e.g., AAPL, MSFT)
+            - **Network issues** - Check your internet connection
+            
+            Try again in a few minutes with fewer stocks (1-3 tickers).
+            """)
+            st.stop()
         
-        if pe_data:
-            pe_df = pd.DataFrame(pe_data)
-            fig_pe = px.bar(
-                pe_df,
-                x='Ticker',
-                y='P/E Ratio',
-                title='P/E Ratio Comparison',
-                color='Ticker'
-            )
-            st.plotly_chart(fig_pe, use_container_width=True)
-
-        # Financial Ratios Comparison Chart
-        st.subheader("Financial Ratios Comparison")
-
-        ratio_metrics = [
-            ('Operating Margin', lambda info: info.get('operatingMargins')),
-            ('Profit Margin', lambda info: info.get('profitMargins')),
-            ('ROE', lambda info: info.get('returnOnEquity')),
-            ('Debt/Equity', lambda info: info.get('debtToEquity')),
-            ('Current Ratio', lambda info: info.get('currentRatio')),
-            ('P/E Ratio', lambda info: info.get('trailingPE')),
-            ('Forward P/E', lambda info: info.get('forwardPE')),
-            ('Price/Book', lambda info: info.get('priceToBook')),
-            ('Dividend Yield', lambda info: info.get('dividendYield')),
-        ]
-
-        ratio_data = []
-        for ticker, data in stock_data.items():
-            info = data['info']
-            row = {'Ticker': ticker}
-            for name, fn in ratio_metrics:
-                val = fn(info)
-                if name in ['Operating Margin', 'Profit Margin', 'ROE', 'Dividend Yield'] and isinstance(val, (int, float)):
-                    row[name] = val * 100
-                elif isinstance(val, (int, float)):
-                    row[name] = val
-                else:
-                    row[name] = None
-            ratio_data.append(row)
-
-        ratio_df = pd.DataFrame(ratio_data)
-        if not ratio_df.drop(columns=['Ticker']).isna().all().all():
-            ratio_melt = ratio_df.melt(id_vars='Ticker', var_name='Metric', value_name='Value').dropna(subset=['Value'])
-            if not ratio_melt.empty:
-                fig_ratios = px.bar(
-                    ratio_melt,
-                    x='Ticker',
-                    y='Value',
-                    color='Metric',
-                    barmode='group',
-                    title='Financial Ratios Comparison',
-                    labels={'Value': 'Value (percent for margins/ROE/dividend)'}
-                )
-                st.plotly_chart(fig_ratios, use_container_width=True)
-        else:
-            st.info("No ratio data available to plot.")
+        st.session_state['stock_data'] = stock_data
+        st.session_state['cache_key'] = cache_key
+    
+    # Only the selected view is built on each rerun
+    if view == "📊 Overview":
+        render_overview(stock_data)
+    elif view == "📈 Price Charts":
+        render_charts(stock_data, time_period)
+    elif view == "💰 Financials":
+        render_financials(stock_data)
+    else:
+        render_comparison(stock_data)
 
 else:
     # Welcome screen